@@ -1,12 +1,29 @@
-from django.db import models, connection
+from django.conf import settings
+from django.core.management.color import no_style
+from django.db import DatabaseError, models, connection, connections, router, transaction
+from django.db.models import Count
 from django.db.backends.base.schema import BaseDatabaseSchemaEditor
+from django.db.backends.utils import truncate_name
 from rest_framework.exceptions import ValidationError
 
+from djangodynamictables import expressions
 from djangodynamictables.models import DynamicModelMetadata
 
 APP_LABEL = 'djangodynamictables'
 
 
+class TableAlreadyExists(Exception):
+    pass
+
+
+class TableDoesNotExist(Exception):
+    pass
+
+
+class SummaryViewDoesNotExist(Exception):
+    pass
+
+
 def get_model_field(field_type: str):
     return {
         'string': models.CharField(max_length=100),
@@ -15,9 +32,22 @@ def get_model_field(field_type: str):
     }.get(field_type)
 
 
-def create_dynamic_model(fields, name):
+def get_computed_field_db_type(field_type: str) -> str:
+    """Computed values can be longer or larger than the values of regular fields, e.g. name || name."""
+    return {
+        'string': 'text',
+        'number': 'bigint',
+        'boolean': 'boolean'
+    }.get(field_type)
+
+
+def create_dynamic_model(fields, name, computed_fields=()):
+    """
+    Computed fields are generated columns that can only be read, so they should only be passed
+    when the model is used to read rows.
+    """
     model_fields = {}
-    for field in fields:
+    for field in [*fields, *computed_fields]:
         field_type = field.get('type')
         field_title = field.get('title')
         model_fields[field_title] = get_model_field(field_type)
@@ -39,9 +69,89 @@ def get_schema_editor() -> BaseDatabaseSchemaEditor:
     return connection.schema_editor()
 
 
-def create_model_schema(DynamicModel):
+def get_summary_view_table(DynamicModel, summary_view: dict) -> str:
+    return f"{DynamicModel._meta.db_table}__{summary_view['name']}"
+
+
+def get_summary_view_max_name_length(model_name: str) -> int:
+    """
+    Postgres truncates longer identifiers, so summary view names have to fit in what the table name
+    leaves of the identifier length.
+    """
+    max_name_length = connection.ops.max_name_length()
+    db_table = truncate_name(f'{APP_LABEL}_{model_name.lower()}', max_name_length)
+    return max_name_length - len(f'{db_table}__')
+
+
+def add_computed_field(schema_editor, DynamicModel, computed_field: dict, index: int):
+    """Errors are keyed by the `index` of the computed field in the table, like the TableSerializer ones."""
+    quote_name = schema_editor.quote_name
+    field_titles = [field.column for field in DynamicModel._meta.concrete_fields if not field.primary_key]
+    expression = expressions.compile_expression(computed_field['expression'], field_titles)
+    db_type = get_computed_field_db_type(computed_field['type'])
+    try:
+        schema_editor.execute(
+            f'ALTER TABLE {quote_name(DynamicModel._meta.db_table)} ADD COLUMN {quote_name(computed_field["title"])} '
+            f'{db_type} GENERATED ALWAYS AS ({expression}) STORED',
+            params=None
+        )
+    except DatabaseError as e:
+        raise ValidationError(
+            {'computed_fields': {index: {'expression': [f'Invalid expression: {str(e).splitlines()[0]}']}}})
+
+
+def remove_computed_field(schema_editor, DynamicModel, computed_field: dict):
+    quote_name = schema_editor.quote_name
+    schema_editor.execute(
+        f'ALTER TABLE {quote_name(DynamicModel._meta.db_table)} DROP COLUMN {quote_name(computed_field["title"])}',
+        params=None
+    )
+
+
+def create_summary_view(schema_editor, DynamicModel, summary_view: dict):
+    """
+    Summary views are materialized views grouping the table rows. Those with a group by get a unique index,
+    so they can be refreshed concurrently without blocking readers.
+    """
+    quote_name = schema_editor.quote_name
+    view_table = quote_name(get_summary_view_table(DynamicModel, summary_view))
+    group_by = ', '.join(quote_name(title) for title in summary_view['group_by'])
+    aggregates = ', '.join(
+        f"{aggregate['function'].upper()}({quote_name(aggregate['field']) if aggregate.get('field') else '*'}) "
+        f"AS {quote_name(aggregate['title'])}"
+        for aggregate in summary_view['aggregates']
+    )
+    select = f'SELECT {group_by}, {aggregates}' if group_by else f'SELECT {aggregates}'
+    sql = f'{select} FROM {quote_name(DynamicModel._meta.db_table)}'
+    if group_by:
+        sql += f' GROUP BY {group_by}'
+    schema_editor.execute(f'CREATE MATERIALIZED VIEW {view_table} AS {sql}', params=None)
+    if group_by:
+        schema_editor.execute(f'CREATE UNIQUE INDEX ON {view_table} ({group_by})', params=None)
+
+
+def drop_summary_view(schema_editor, DynamicModel, summary_view: dict):
+    view_table = schema_editor.quote_name(get_summary_view_table(DynamicModel, summary_view))
+    schema_editor.execute(f'DROP MATERIALIZED VIEW IF EXISTS {view_table}', params=None)
+
+
+def refresh_summary_view(cursor, DynamicModel, summary_view: dict):
+    view_table = connection.ops.quote_name(get_summary_view_table(DynamicModel, summary_view))
+    concurrently = 'CONCURRENTLY ' if summary_view['group_by'] else ''
+    cursor.execute(f'REFRESH MATERIALIZED VIEW {concurrently}{view_table}')
+
+
+def create_computed_schema(schema_editor, DynamicModel, computed_fields=(), summary_views=()):
+    for index, computed_field in enumerate(computed_fields):
+        add_computed_field(schema_editor, DynamicModel, computed_field, index)
+    for summary_view in summary_views:
+        create_summary_view(schema_editor, DynamicModel, summary_view)
+
+
+def create_model_schema(DynamicModel, computed_fields=(), summary_views=()):
     with get_schema_editor() as schema_editor:
         schema_editor.create_model(DynamicModel)
+        create_computed_schema(schema_editor, DynamicModel, computed_fields, summary_views)
 
 
 def update_model_schema(CurrentDynamicModel, UpdatedDynamicModel, updated_model_data: dict,
@@ -49,6 +159,14 @@ def update_model_schema(CurrentDynamicModel, UpdatedDynamicModel, updated_model_
     print(CurrentDynamicModel.__dict__)
     print(UpdatedDynamicModel.__dict__)
     with get_schema_editor() as schema_editor:
+        # Summary views depend on the table columns, so they are recreated after the columns are updated.
+        for summary_view in current_model_metadata.summary_views:
+            drop_summary_view(schema_editor, CurrentDynamicModel, summary_view)
+        updated_computed_fields = updated_model_data.get('computed_fields', [])
+        for current_computed_field in current_model_metadata.computed_fields:
+            if current_computed_field not in updated_computed_fields:
+                remove_computed_field(schema_editor, CurrentDynamicModel, current_computed_field)
+
         updated_model_fields = updated_model_data['fields']
         for current_field in current_model_metadata.fields:
             field_name = current_field['title']
@@ -81,3 +199,165 @@ def update_model_schema(CurrentDynamicModel, UpdatedDynamicModel, updated_model_
                                                               include_default=True)
                 print(definition, params)
                 schema_editor.add_field(UpdatedDynamicModel, dynamic_model_field)
+
+        for index, updated_computed_field in enumerate(updated_computed_fields):
+            if updated_computed_field not in current_model_metadata.computed_fields:
+                add_computed_field(schema_editor, UpdatedDynamicModel, updated_computed_field, index)
+        for summary_view in updated_model_data.get('summary_views', []):
+            create_summary_view(schema_editor, UpdatedDynamicModel, summary_view)
+
+
+def model_table_exists(DynamicModel):
+    return DynamicModel._meta.db_table in connection.introspection.table_names()
+
+
+def check_tables_quota(owner, new_tables_count=1):
+    user_tables_count = DynamicModelMetadata.objects.filter(owner=owner).aggregate(count=Count('id'))['count']
+    if user_tables_count + new_tables_count > settings.MAX_TABLES_PER_USER:
+        raise ValidationError('Exceeded max tables allowed.')
+
+
+def create_table(owner, model_name, fields, computed_fields=(), summary_views=()) -> DynamicModelMetadata:
+    check_tables_quota(owner)
+    DynamicModel = create_dynamic_model(fields, model_name)
+    if model_table_exists(DynamicModel):
+        raise TableAlreadyExists('Table already exists.')
+
+    create_model_schema(DynamicModel, computed_fields, summary_views)
+    return DynamicModelMetadata.objects.create(
+        model_name=model_name,
+        fields=fields,
+        computed_fields=list(computed_fields),
+        summary_views=list(summary_views),
+        owner=owner
+    )
+
+
+def create_tables(owner, tables) -> list:
+    """
+    Creates all tables and their metadata in a single transaction, or none of them.
+    Raises a ValidationError with the errors of each table, keyed by its position in `tables`.
+    """
+    check_tables_quota(owner, len(tables))
+    existing_tables = set(connection.introspection.table_names())
+    DynamicModels = []
+    errors = {}
+    for index, table in enumerate(tables):
+        DynamicModel = create_dynamic_model(table['fields'], table['name'])
+        if DynamicModel._meta.db_table in existing_tables:
+            errors[index] = ['Table already exists.']
+        existing_tables.add(DynamicModel._meta.db_table)
+        DynamicModels.append(DynamicModel)
+    if errors:
+        raise ValidationError({'tables': errors})
+
+    with transaction.atomic():
+        with get_schema_editor() as schema_editor:
+            for index, (DynamicModel, table) in enumerate(zip(DynamicModels, tables)):
+                schema_editor.create_model(DynamicModel)
+                try:
+                    create_computed_schema(schema_editor, DynamicModel, table.get('computed_fields', []),
+                                           table.get('summary_views', []))
+                except ValidationError as e:
+                    raise ValidationError({'tables': {index: e.detail}})
+        return DynamicModelMetadata.objects.bulk_create([
+            DynamicModelMetadata(model_name=table['name'], fields=table['fields'],
+                                 computed_fields=table.get('computed_fields', []),
+                                 summary_views=table.get('summary_views', []), owner=owner)
+            for table in tables
+        ])
+
+
+def get_table_metadata(owner, model_name) -> DynamicModelMetadata:
+    model_metadata = DynamicModelMetadata.objects.filter(model_name=model_name, owner=owner).first()
+    if model_metadata is None:
+        raise TableDoesNotExist('Table does not exist.')
+    return model_metadata
+
+
+def get_model_columns(DynamicModel) -> list:
+    """Returns the writable columns of the model, computed fields excluded."""
+    return [field.column for field in DynamicModel._meta.concrete_fields]
+
+
+def reset_model_sequence(cursor, DynamicModel):
+    for sql in connection.ops.sequence_reset_sql(no_style(), [DynamicModel]):
+        cursor.execute(sql)
+
+
+def clone_table(owner, model_name, clone_model_name) -> DynamicModelMetadata:
+    """Copies the table structure and rows on the server, so rows never pass through Python."""
+    model_metadata = get_table_metadata(owner, model_name)
+    check_tables_quota(owner)
+    DynamicModel = create_dynamic_model(model_metadata.fields, model_name)
+    CloneDynamicModel = create_dynamic_model(model_metadata.fields, clone_model_name)
+    if model_table_exists(CloneDynamicModel):
+        raise TableAlreadyExists('Table already exists.')
+    max_name_length = get_summary_view_max_name_length(clone_model_name)
+    if any(len(summary_view['name']) > max_name_length for summary_view in model_metadata.summary_views):
+        raise ValidationError({'name': ['Name is too long for the summary views of the table.']})
+
+    quote_name = connection.ops.quote_name
+    table = quote_name(DynamicModel._meta.db_table)
+    clone_table_name = quote_name(CloneDynamicModel._meta.db_table)
+    columns = ', '.join(quote_name(column) for column in get_model_columns(DynamicModel))
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(f'CREATE TABLE {clone_table_name} (LIKE {table} INCLUDING ALL)')
+            cursor.execute(f'INSERT INTO {clone_table_name} ({columns}) SELECT {columns} FROM {table}')
+            reset_model_sequence(cursor, CloneDynamicModel)
+        # Computed fields are copied by LIKE, summary views have to be created for the new table.
+        with get_schema_editor() as schema_editor:
+            for summary_view in model_metadata.summary_views:
+                create_summary_view(schema_editor, CloneDynamicModel, summary_view)
+        return DynamicModelMetadata.objects.create(
+            model_name=clone_model_name,
+            fields=model_metadata.fields,
+            computed_fields=model_metadata.computed_fields,
+            summary_views=model_metadata.summary_views,
+            owner=owner
+        )
+
+
+def update_table(owner, model_name, fields, computed_fields=(), summary_views=()) -> DynamicModelMetadata:
+    existing_model_metadata = get_table_metadata(owner, model_name)
+    CurrentDynamicModel = create_dynamic_model(existing_model_metadata.fields, model_name)
+    UpdatedDynamicModel = create_dynamic_model(fields, model_name)
+
+    update_model_schema(CurrentDynamicModel, UpdatedDynamicModel,
+                        {'name': model_name, 'fields': fields, 'computed_fields': list(computed_fields),
+                         'summary_views': list(summary_views)},
+                        existing_model_metadata)
+    existing_model_metadata.fields = fields
+    existing_model_metadata.computed_fields = list(computed_fields)
+    existing_model_metadata.summary_views = list(summary_views)
+    existing_model_metadata.save()
+    return existing_model_metadata
+
+
+def refresh_summary_views(owner, model_name, refresh=None) -> list:
+    """Refreshes the summary views of a table, only those with the given `refresh` policy if set."""
+    model_metadata = get_table_metadata(owner, model_name)
+    DynamicModel = create_dynamic_model(model_metadata.fields, model_name)
+    summary_views = [summary_view for summary_view in model_metadata.summary_views
+                     if refresh is None or summary_view['refresh'] == refresh]
+    with connection.cursor() as cursor:
+        for summary_view in summary_views:
+            refresh_summary_view(cursor, DynamicModel, summary_view)
+    return [summary_view['name'] for summary_view in summary_views]
+
+
+def get_summary_view_rows(owner, model_name, view_name) -> list:
+    model_metadata = get_table_metadata(owner, model_name)
+    summary_view = next(filter(lambda view: view['name'] == view_name, model_metadata.summary_views), None)
+    if summary_view is None:
+        raise SummaryViewDoesNotExist('Summary view does not exist.')
+    DynamicModel = create_dynamic_model(model_metadata.fields, model_name)
+    view_connection = connections[router.db_for_read(DynamicModel)]
+    quote_name = view_connection.ops.quote_name
+    view_table = quote_name(get_summary_view_table(DynamicModel, summary_view))
+    order_by = ', '.join(quote_name(title) for title in summary_view['group_by']) or '1'
+    with view_connection.cursor() as cursor:
+        cursor.execute(f'SELECT * FROM {view_table} ORDER BY {order_by} LIMIT 1000')
+        columns = [column.name for column in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
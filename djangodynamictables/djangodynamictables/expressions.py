@@ -0,0 +1,61 @@
+"""
+Compiles the expressions of computed fields to SQL. Expressions may only use field titles, number and
+string literals, arithmetic/comparison operators and a small set of immutable functions, so they can
+be used as PostgreSQL generated columns without letting clients run arbitrary SQL.
+Field titles that are not plain identifiers can be written in double quotes, e.g. "first name" || 'x'.
+"""
+import re
+
+from rest_framework.exceptions import ValidationError
+
+FUNCTIONS = {'abs', 'coalesce', 'greatest', 'least', 'length', 'lower', 'nullif', 'round', 'upper'}
+KEYWORDS = {'and', 'case', 'else', 'end', 'false', 'is', 'not', 'null', 'or', 'then', 'true', 'when'}
+
+TOKEN_PATTERN = re.compile(r'''
+    (?P<space>\s+)
+  | (?P<number>\d+(?:\.\d+)?)
+  | (?P<string>'(?:[^']|'')*')
+  | (?P<quoted_identifier>"(?:[^"]|"")+")
+  | (?P<identifier>[A-Za-z_][A-Za-z0-9_]*)
+  | (?P<operator>\|\||<=|>=|<>|!=|[-+*/%=<>(),])
+''', re.VERBOSE)
+
+
+def quote_identifier(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def compile_expression(expression: str, field_titles) -> str:
+    sql_tokens = []
+    depth = 0
+    position = 0
+    while position < len(expression):
+        match = TOKEN_PATTERN.match(expression, position)
+        if match is None:
+            raise ValidationError(f'Invalid expression near "{expression[position:position + 10]}".')
+        position = match.end()
+        kind, token = match.lastgroup, match.group()
+        if kind == 'space':
+            continue
+        if kind == 'quoted_identifier':
+            token = token[1:-1].replace('""', '"')
+        if kind in ('identifier', 'quoted_identifier'):
+            if kind == 'identifier' and token.lower() in FUNCTIONS | KEYWORDS:
+                token = token.upper()
+            elif token in field_titles:
+                token = quote_identifier(token)
+            else:
+                raise ValidationError(f'Unknown field {token}.')
+        elif token == '(':
+            depth += 1
+        elif token == ')':
+            depth -= 1
+            if depth < 0:
+                raise ValidationError('Unbalanced parentheses.')
+        sql_tokens.append(token)
+    if depth != 0:
+        raise ValidationError('Unbalanced parentheses.')
+    if not sql_tokens:
+        raise ValidationError('Expression is empty.')
+    # Tokens are separated by spaces so operators can't be combined into SQL comments, e.g. "- -".
+    return ' '.join(sql_tokens)
@@ -0,0 +1,176 @@
+from datetime import timedelta
+from typing import Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from . import dynamic_models, routers, snapshots
+from .models import Job, TableSnapshot
+
+JOB_HANDLERS = {}
+
+# Operations that report their progress, so they can be stopped while running.
+CANCELLABLE_OPERATIONS = set()
+
+# Errors that will fail the same way on every attempt, so the job is not retried.
+NON_RETRYABLE_ERRORS = (ValidationError, dynamic_models.TableAlreadyExists, dynamic_models.TableDoesNotExist)
+
+
+class JobCancelled(Exception):
+    pass
+
+
+def job_handler(operation: str, cancellable: bool = False):
+    def register(func):
+        JOB_HANDLERS[operation] = func
+        if cancellable:
+            CANCELLABLE_OPERATIONS.add(operation)
+        return func
+
+    return register
+
+
+def enqueue_job(owner, operation: str, payload: dict, unique: bool = False) -> Job:
+    """Queues a job. With `unique`, an identical job that is still pending is returned instead."""
+    if operation not in JOB_HANDLERS:
+        raise ValueError(f'Unknown job operation {operation}.')
+    if unique:
+        job = Job.objects.filter(owner=owner, operation=operation, payload=payload, status=Job.PENDING).first()
+        if job is not None:
+            return job
+    return Job.objects.create(
+        owner=owner,
+        operation=operation,
+        payload=payload,
+        max_attempts=settings.JOB_MAX_ATTEMPTS
+    )
+
+
+def claim_next_job() -> Optional[Job]:
+    """
+    Claims the next pending job. Running jobs whose lease expired, because their worker died,
+    are claimed again, or failed once they used all their attempts.
+    """
+    now = timezone.now()
+    lease_expired = Q(status=Job.RUNNING, updated_at__lt=now - timedelta(seconds=settings.JOB_LEASE_SECONDS))
+    with transaction.atomic():
+        Job.objects.filter(lease_expired, attempts__gte=F('max_attempts')).update(
+            status=Job.FAILED,
+            error='Job worker stopped before the job finished.',
+            updated_at=now
+        )
+        job = Job.objects.select_for_update(skip_locked=True).filter(
+            Q(status=Job.PENDING, run_after__lte=now) | lease_expired
+        ).order_by('run_after', 'id').first()
+        if job is None:
+            return None
+        job.status = Job.RUNNING
+        job.attempts += 1
+        job.save(update_fields=['status', 'attempts', 'updated_at'])
+    return job
+
+
+def renew_lease(job: Job):
+    Job.objects.filter(pk=job.pk, status=Job.RUNNING).update(updated_at=timezone.now())
+
+
+def report_progress(job: Job, progress: int):
+    """
+    Stores the job progress (0-100), which also renews the job lease,
+    and raises JobCancelled if a cancellation was requested.
+    """
+    job.progress = progress
+    job.save(update_fields=['progress', 'updated_at'])
+    if Job.objects.filter(pk=job.pk, cancel_requested=True).exists():
+        raise JobCancelled()
+
+
+def cancel_job(job: Job) -> bool:
+    """
+    Cancels a pending job right away, or asks a running job to stop at its next progress report.
+    Returns False if the job is finished, or running an operation that can't be stopped.
+    """
+    if Job.objects.filter(pk=job.pk, status=Job.PENDING).update(status=Job.CANCELLED, updated_at=timezone.now()):
+        return True
+    if job.operation not in CANCELLABLE_OPERATIONS:
+        return False
+    return bool(Job.objects.filter(pk=job.pk, status=Job.RUNNING).update(cancel_requested=True))
+
+
+def run_job(job: Job):
+    handler = JOB_HANDLERS[job.operation]
+    try:
+        if Job.objects.filter(pk=job.pk, cancel_requested=True).exists():
+            raise JobCancelled()
+        job.result = handler(job)
+        job.status = Job.SUCCEEDED
+        job.progress = 100
+        job.error = None
+    except JobCancelled:
+        job.status = Job.CANCELLED
+    except NON_RETRYABLE_ERRORS as e:
+        job.status = Job.FAILED
+        job.error = e.detail if isinstance(e, ValidationError) else str(e)
+    except Exception as e:
+        job.error = str(e)
+        if job.attempts < job.max_attempts:
+            job.status = Job.PENDING
+            job.run_after = timezone.now() + timedelta(seconds=settings.JOB_RETRY_DELAY * job.attempts)
+        else:
+            job.status = Job.FAILED
+    # cancel_requested is left out, so a cancellation requested while the job was running stays recorded.
+    job.save(update_fields=['status', 'progress', 'result', 'error', 'run_after', 'updated_at'])
+    if job.status == Job.SUCCEEDED:
+        # The owner may poll the job and read the changes right away, before replicas catch up.
+        routers.pin_to_primary(job.owner)
+    return job
+
+
+@job_handler('create_table')
+def create_table_job(job: Job):
+    metadata = dynamic_models.create_table(job.owner, job.payload['name'], job.payload['fields'],
+                                           job.payload.get('computed_fields', []), job.payload.get('summary_views', []))
+    return {'model_name': metadata.model_name}
+
+
+@job_handler('create_tables')
+def create_tables_job(job: Job):
+    created_tables = dynamic_models.create_tables(job.owner, job.payload['tables'])
+    return {'model_names': [metadata.model_name for metadata in created_tables]}
+
+
+@job_handler('update_table')
+def update_table_job(job: Job):
+    metadata = dynamic_models.update_table(job.owner, job.payload['name'], job.payload['fields'],
+                                           job.payload.get('computed_fields', []), job.payload.get('summary_views', []))
+    return {'model_name': metadata.model_name}
+
+
+@job_handler('clone_table')
+def clone_table_job(job: Job):
+    metadata = dynamic_models.clone_table(job.owner, job.payload['name'], job.payload['clone_name'])
+    return {'model_name': metadata.model_name}
+
+
+@job_handler('create_snapshot', cancellable=True)
+def create_snapshot_job(job: Job):
+    snapshot = snapshots.create_snapshot(job.owner, job.payload['name'],
+                                         on_progress=lambda progress: report_progress(job, progress))
+    return {'snapshot_id': snapshot.id, 'row_count': snapshot.row_count}
+
+
+@job_handler('restore_snapshot', cancellable=True)
+def restore_snapshot_job(job: Job):
+    snapshot = TableSnapshot.objects.get(owner=job.owner, id=job.payload['snapshot_id'])
+    row_count = snapshots.restore_snapshot(job.owner, snapshot,
+                                           on_progress=lambda progress: report_progress(job, progress))
+    return {'model_name': snapshot.model_name, 'row_count': row_count}
+
+
+@job_handler('refresh_summary_views')
+def refresh_summary_views_job(job: Job):
+    view_names = dynamic_models.refresh_summary_views(job.owner, job.payload['name'], job.payload.get('refresh'))
+    return {'summary_views': view_names}
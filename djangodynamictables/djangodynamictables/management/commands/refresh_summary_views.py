@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from djangodynamictables import dynamic_models
+from djangodynamictables.models import DynamicModelMetadata
+
+
+class Command(BaseCommand):
+    help = 'Refreshes the summary views of all dynamic tables, e.g. from a cron job.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--refresh', choices=['on_write', 'scheduled'], default='scheduled',
+                            help='Only refresh the summary views with this refresh policy.')
+
+    def handle(self, *args, **options):
+        for model_metadata in DynamicModelMetadata.objects.exclude(summary_views=[]).order_by('id'):
+            view_names = dynamic_models.refresh_summary_views(model_metadata.owner, model_metadata.model_name,
+                                                              options['refresh'])
+            for view_name in view_names:
+                self.stdout.write(f'Refreshed {model_metadata.model_name}.{view_name}')
@@ -0,0 +1,62 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+
+from djangodynamictables import jobs
+
+
+class Command(BaseCommand):
+    help = 'Runs queued background jobs using a pool of worker threads.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=settings.JOB_WORKERS)
+        parser.add_argument('--poll-interval', type=float, default=settings.JOB_POLL_INTERVAL)
+        parser.add_argument('--once', action='store_true', help='Exit when there are no more jobs to run.')
+
+    def handle(self, *args, **options):
+        stop = threading.Event()
+        workers = options['workers']
+        self.stdout.write(f'Starting {workers} job workers')
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(self.work, stop, options['poll_interval'], options['once'])
+                       for _ in range(workers)]
+            try:
+                for future in futures:
+                    future.result()
+            except KeyboardInterrupt:
+                self.stdout.write('Stopping job workers after their current job')
+                stop.set()
+
+    def work(self, stop: threading.Event, poll_interval: float, once: bool):
+        try:
+            while not stop.is_set():
+                close_old_connections()
+                job = jobs.claim_next_job()
+                if job is None:
+                    if once:
+                        return
+                    stop.wait(poll_interval)
+                    continue
+                self.stdout.write(f'Running job {job.id} ({job.operation})')
+                job_finished = threading.Event()
+                heartbeat = threading.Thread(target=self.renew_lease, args=(job, job_finished), daemon=True)
+                heartbeat.start()
+                try:
+                    job = jobs.run_job(job)
+                finally:
+                    job_finished.set()
+                    heartbeat.join()
+                self.stdout.write(f'Job {job.id} {job.status}')
+        finally:
+            connection.close()
+
+    def renew_lease(self, job, job_finished: threading.Event):
+        """Keeps the lease of a job that runs longer than JOB_LEASE_SECONDS without reporting progress."""
+        try:
+            while not job_finished.wait(settings.JOB_LEASE_SECONDS / 3):
+                jobs.renew_lease(job)
+        finally:
+            connection.close()
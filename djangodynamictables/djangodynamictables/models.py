@@ -1,5 +1,6 @@
 from django.contrib.auth.models import User
 from django.db import models
+from django.utils import timezone
 
 
 class DynamicModelMetadata(models.Model):
@@ -10,9 +11,84 @@ class DynamicModelMetadata(models.Model):
         null=False,
         blank=False,
     )
+    computed_fields = models.JSONField(
+        verbose_name="Model computed fields",
+        default=list,
+        blank=True,
+    )
+    summary_views = models.JSONField(
+        verbose_name="Model summary views",
+        default=list,
+        blank=True,
+    )
 
     class Meta:
         managed = True
         indexes = [
             models.Index(fields=["model_name"]),
         ]
+
+
+class TableSnapshot(models.Model):
+    model_name = models.CharField(max_length=255)
+    owner = models.ForeignKey(User, null=True, blank=True, on_delete=models.CASCADE)
+    fields = models.JSONField(
+        verbose_name="Model fields",
+        null=False,
+        blank=False,
+    )
+    computed_fields = models.JSONField(
+        verbose_name="Model computed fields",
+        default=list,
+        blank=True,
+    )
+    summary_views = models.JSONField(
+        verbose_name="Model summary views",
+        default=list,
+        blank=True,
+    )
+    path = models.CharField(max_length=1024)
+    row_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        managed = True
+        indexes = [
+            models.Index(fields=["owner", "model_name"]),
+        ]
+
+
+class Job(models.Model):
+    PENDING = 'pending'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    CANCELLED = 'cancelled'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (SUCCEEDED, 'Succeeded'),
+        (FAILED, 'Failed'),
+        (CANCELLED, 'Cancelled'),
+    ]
+    FINISHED_STATUSES = (SUCCEEDED, FAILED, CANCELLED)
+
+    owner = models.ForeignKey(User, null=True, blank=True, on_delete=models.CASCADE)
+    operation = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=PENDING)
+    progress = models.PositiveSmallIntegerField(default=0)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=1)
+    cancel_requested = models.BooleanField(default=False)
+    result = models.JSONField(null=True, blank=True)
+    error = models.JSONField(null=True, blank=True)
+    run_after = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        managed = True
+        indexes = [
+            models.Index(fields=["status", "run_after"]),
+        ]
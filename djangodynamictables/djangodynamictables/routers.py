@@ -0,0 +1,66 @@
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.permissions import SAFE_METHODS
+
+APP_LABEL = 'djangodynamictables'
+
+# Models that are always read from the primary, e.g. because they are polled right after being written.
+PRIMARY_ONLY_MODELS = {'job'}
+
+replica_reads_enabled = ContextVar('replica_reads_enabled', default=False)
+
+
+class ReplicaRouter:
+    """
+    Sends reads of dynamic models and their metadata to one of the `DATABASE_REPLICAS`.
+    Reads only go to a replica while a request allows it (see ReplicaRoutingMixin),
+    everything else (writes, background jobs, management commands) uses the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label != APP_LABEL or model._meta.model_name in PRIMARY_ONLY_MODELS:
+            return None
+        if not settings.DATABASE_REPLICAS or not replica_reads_enabled.get():
+            return None
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def allow_migrate(self, db, app_label, **hints):
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
+
+
+def get_pin_cache_key(user) -> str:
+    return f'replica-pin:{user.pk}'
+
+
+def pin_to_primary(user):
+    cache.set(get_pin_cache_key(user), True, settings.REPLICA_PIN_SECONDS)
+
+
+def is_pinned_to_primary(user) -> bool:
+    return cache.get(get_pin_cache_key(user), False)
+
+
+class ReplicaRoutingMixin:
+    """
+    Lets safe requests read from the replicas, unless the user wrote something in the last
+    `REPLICA_PIN_SECONDS`, in which case they keep reading from the primary to see their own writes.
+    """
+    replica_reads_token = None
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method in SAFE_METHODS and not is_pinned_to_primary(request.user):
+            self.replica_reads_token = replica_reads_enabled.set(True)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        if self.replica_reads_token is not None:
+            replica_reads_enabled.reset(self.replica_reads_token)
+            self.replica_reads_token = None
+        elif request.method not in SAFE_METHODS and response.status_code < 400 and request.user.is_authenticated:
+            pin_to_primary(request.user)
+        return super().finalize_response(request, response, *args, **kwargs)
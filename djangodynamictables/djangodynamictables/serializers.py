@@ -1,17 +1,127 @@
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
 
+from . import dynamic_models, expressions
+from .models import Job, TableSnapshot
+
 
 class FieldSerializer(serializers.Serializer):
     type = serializers.ChoiceField(choices=['string', 'number', 'boolean'])
     title = serializers.CharField(min_length=3, max_length=100)
 
 
+class ComputedFieldSerializer(FieldSerializer):
+    expression = serializers.CharField(max_length=1000)
+
+
+class AggregateSerializer(serializers.Serializer):
+    title = serializers.CharField(min_length=3, max_length=100)
+    function = serializers.ChoiceField(choices=['count', 'sum', 'avg', 'min', 'max'])
+    field = serializers.CharField(required=False)
+
+
+class SummaryViewSerializer(serializers.Serializer):
+    name = serializers.CharField(min_length=3, max_length=100)
+    group_by = serializers.ListField(child=serializers.CharField(), required=False, default=list)
+    aggregates = serializers.ListField(child=AggregateSerializer(), min_length=1)
+    refresh = serializers.ChoiceField(choices=['on_write', 'scheduled'], default='on_write')
+
+
 class TableSerializer(serializers.Serializer):
     name = serializers.CharField(min_length=3, max_length=100)
     fields = serializers.ListField(child=FieldSerializer())
+    computed_fields = serializers.ListField(child=ComputedFieldSerializer(), required=False, default=list)
+    summary_views = serializers.ListField(child=SummaryViewSerializer(), required=False, default=list)
 
     def validate_fields(self, fields):
         if len(fields) > 10:
             raise ValidationError("Maximum of 10 fields allowed.")
         return fields
+
+    def validate(self, data):
+        field_types = {field['title']: field['type'] for field in data['fields']}
+        field_titles = set(field_types)
+        errors = {}
+
+        computed_field_errors = {}
+        for index, computed_field in enumerate(data['computed_fields']):
+            if computed_field['title'] in field_types:
+                computed_field_errors[index] = {'title': ['Field already exists.']}
+                continue
+            try:
+                # Generated columns can't reference other generated columns, so only regular fields can be used.
+                expressions.compile_expression(computed_field['expression'], field_titles)
+            except ValidationError as e:
+                computed_field_errors[index] = {'expression': e.detail}
+            # Summary views can use computed fields like regular ones.
+            field_types[computed_field['title']] = computed_field['type']
+        if computed_field_errors:
+            errors['computed_fields'] = computed_field_errors
+
+        summary_view_errors = {}
+        summary_view_names = set()
+        max_name_length = dynamic_models.get_summary_view_max_name_length(data['name'])
+        for index, summary_view in enumerate(data['summary_views']):
+            view_errors = self.validate_summary_view(summary_view, field_types)
+            if summary_view['name'] in summary_view_names:
+                view_errors['name'] = ['Summary view already exists.']
+            elif len(summary_view['name']) > max_name_length:
+                view_errors['name'] = [f'Ensure this field has no more than {max_name_length} characters '
+                                       f'for this table.']
+            summary_view_names.add(summary_view['name'])
+            if view_errors:
+                summary_view_errors[index] = view_errors
+        if summary_view_errors:
+            errors['summary_views'] = summary_view_errors
+
+        if errors:
+            raise ValidationError(errors)
+        return data
+
+    def validate_summary_view(self, summary_view, field_types) -> dict:
+        errors = {}
+        unknown_fields = [title for title in summary_view['group_by'] if title not in field_types]
+        duplicate_fields = {title for title in summary_view['group_by'] if summary_view['group_by'].count(title) > 1}
+        if unknown_fields:
+            errors['group_by'] = [f'Unknown field {title}.' for title in unknown_fields]
+        elif duplicate_fields:
+            errors['group_by'] = [f'Duplicate field {title}.' for title in sorted(duplicate_fields)]
+        aggregate_errors = {}
+        column_titles = set(summary_view['group_by'])
+        for index, aggregate in enumerate(summary_view['aggregates']):
+            field_title = aggregate.get('field')
+            if aggregate['title'] in column_titles:
+                aggregate_errors[index] = {'title': ['Column already exists.']}
+            elif field_title is None and aggregate['function'] != 'count':
+                aggregate_errors[index] = {'field': ['This field is required.']}
+            elif field_title is not None and field_title not in field_types:
+                aggregate_errors[index] = {'field': [f'Unknown field {field_title}.']}
+            elif aggregate['function'] in ('sum', 'avg') and field_types[field_title] != 'number':
+                aggregate_errors[index] = {'field': ['A number field is required.']}
+            elif aggregate['function'] in ('min', 'max') and field_types[field_title] == 'boolean':
+                aggregate_errors[index] = {'field': ['A number or string field is required.']}
+            column_titles.add(aggregate['title'])
+        if aggregate_errors:
+            errors['aggregates'] = aggregate_errors
+        return errors
+
+
+class TableBatchSerializer(serializers.Serializer):
+    tables = serializers.ListField(child=TableSerializer(), min_length=1)
+
+
+class TableCloneSerializer(serializers.Serializer):
+    name = serializers.CharField(min_length=3, max_length=100)
+
+
+class TableSnapshotSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = TableSnapshot
+        fields = ['id', 'model_name', 'fields', 'computed_fields', 'summary_views', 'row_count', 'created_at']
+
+
+class JobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Job
+        fields = ['id', 'operation', 'status', 'progress', 'attempts', 'max_attempts', 'cancel_requested', 'result',
+                  'error', 'created_at', 'updated_at']
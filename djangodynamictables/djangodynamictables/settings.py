@@ -114,6 +114,39 @@ DATABASES = {
     }
 }
 
+# Read replicas of the default database, used for reads of dynamic tables.
+# DATABASE_REPLICA_HOSTS is a comma separated list of host or host:port, the other settings are shared
+# by all replicas and default to the ones of the default database. Replicas mirror it in tests.
+DATABASE_REPLICAS = []
+for index, replica_host in enumerate(env.list('DATABASE_REPLICA_HOSTS', default=[]), start=1):
+    host, _, port = replica_host.partition(':')
+    DATABASES[f'replica_{index}'] = {
+        **DATABASES['default'],
+        'NAME': env('DATABASE_REPLICA_NAME', default=env('DATABASE_NAME')),
+        'USER': env('DATABASE_REPLICA_USER', default=env('DATABASE_USER')),
+        'PASSWORD': env('DATABASE_REPLICA_PASSWORD', default=env('DATABASE_PASSWORD')),
+        'HOST': host,
+        'PORT': port or env('DATABASE_PORT'),
+        'TEST': {
+            'MIRROR': 'default',
+        },
+    }
+    DATABASE_REPLICAS.append(f'replica_{index}')
+
+DATABASE_ROUTERS = ['djangodynamictables.routers.ReplicaRouter']
+
+# The cache holds the read-your-writes pins, which are set by the server and job worker processes,
+# so it is shared through the default database. Create its table with `python manage.py createcachetable`.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'django_cache',
+    }
+}
+
+# Seconds during which a user keeps reading from the primary after a write, to see their own writes.
+REPLICA_PIN_SECONDS = env.int('REPLICA_PIN_SECONDS', default=5)
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -152,3 +185,21 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Dynamic tables
+
+MAX_TABLES_PER_USER = env.int('MAX_TABLES_PER_USER', default=10)
+
+# Directory where table snapshots are written, and the number of rows stored per column chunk.
+SNAPSHOT_ROOT = Path(env('SNAPSHOT_ROOT', default=str(BASE_DIR / 'snapshots')))
+SNAPSHOT_CHUNK_SIZE = env.int('SNAPSHOT_CHUNK_SIZE', default=1000)
+
+# Background jobs
+# Heavy table operations can be queued in the database and executed by `manage.py run_jobs`.
+
+JOB_WORKERS = env.int('JOB_WORKERS', default=2)
+JOB_POLL_INTERVAL = env.float('JOB_POLL_INTERVAL', default=1.0)
+JOB_MAX_ATTEMPTS = env.int('JOB_MAX_ATTEMPTS', default=3)
+JOB_RETRY_DELAY = env.int('JOB_RETRY_DELAY', default=30)
+# Running jobs that were not updated for this many seconds are considered lost and claimed again.
+JOB_LEASE_SECONDS = env.int('JOB_LEASE_SECONDS', default=300)
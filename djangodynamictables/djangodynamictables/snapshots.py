@@ -0,0 +1,169 @@
+"""
+Table snapshots are gzip files made of JSON lines. The first line is a header with the table schema
+(the `DynamicModelMetadata.fields`) and column names, each following line is a chunk of up to
+`SNAPSHOT_CHUNK_SIZE` rows stored column by column, e.g. {"rows": 2, "columns": {"id": [1, 2], "age": [30, 41]}}.
+"""
+import gzip
+import json
+import uuid
+from pathlib import Path
+from typing import Callable, Iterator, Optional
+
+from django.conf import settings
+from django.db import connection, transaction
+from rest_framework.exceptions import ValidationError
+
+from . import dynamic_models
+from .models import TableSnapshot
+
+SNAPSHOT_FORMAT = 'djangodynamictables-snapshot'
+SNAPSHOT_VERSION = 1
+
+
+def create_snapshot(owner, model_name, on_progress: Optional[Callable[[int], None]] = None) -> TableSnapshot:
+    model_metadata = dynamic_models.get_table_metadata(owner, model_name)
+    DynamicModel = dynamic_models.create_dynamic_model(model_metadata.fields, model_name)
+    columns = dynamic_models.get_model_columns(DynamicModel)
+    path = Path(settings.SNAPSHOT_ROOT) / str(owner.pk) / f'{uuid.uuid4().hex}.jsonl.gz'
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # The file is only moved to its path once complete, and removed if the snapshot fails or is cancelled.
+    tmp_path = path.with_name(f'{path.name}.tmp')
+
+    row_count = 0
+    # Rows can be added after counting them, so the count is only used as an estimate of the progress.
+    total_rows = max(DynamicModel.objects.count(), 1)
+    try:
+        with gzip.open(tmp_path, 'wt', encoding='utf-8') as snapshot_file:
+            write_line(snapshot_file, {
+                'format': SNAPSHOT_FORMAT,
+                'version': SNAPSHOT_VERSION,
+                'model_name': model_name,
+                'fields': model_metadata.fields,
+                'computed_fields': model_metadata.computed_fields,
+                'summary_views': model_metadata.summary_views,
+                'columns': columns,
+            })
+            rows = DynamicModel.objects.order_by('pk').values_list(*columns).iterator(
+                chunk_size=settings.SNAPSHOT_CHUNK_SIZE)
+            for chunk in chunk_rows(rows, settings.SNAPSHOT_CHUNK_SIZE):
+                write_line(snapshot_file, {
+                    'rows': len(chunk),
+                    'columns': dict(zip(columns, map(list, zip(*chunk)))),
+                })
+                row_count += len(chunk)
+                if on_progress is not None:
+                    on_progress(min(99, row_count * 100 // total_rows))
+        tmp_path.rename(path)
+
+        return TableSnapshot.objects.create(
+            model_name=model_name,
+            owner=owner,
+            fields=model_metadata.fields,
+            computed_fields=model_metadata.computed_fields,
+            summary_views=model_metadata.summary_views,
+            path=str(path),
+            row_count=row_count
+        )
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        path.unlink(missing_ok=True)
+        raise
+
+
+def restore_snapshot(owner, snapshot: TableSnapshot, on_progress: Optional[Callable[[int], None]] = None) -> int:
+    """Recreates the table with the snapshot schema and loads its rows with COPY. Returns the number of rows copied."""
+    if not Path(snapshot.path).exists():
+        raise ValidationError('Snapshot file not found.')
+    model_metadata = dynamic_models.get_table_metadata(owner, snapshot.model_name)
+    CurrentDynamicModel = dynamic_models.create_dynamic_model(model_metadata.fields, snapshot.model_name)
+    with gzip.open(snapshot.path, 'rt', encoding='utf-8') as snapshot_file:
+        header = json.loads(snapshot_file.readline())
+        if header.get('format') != SNAPSHOT_FORMAT or header.get('version') != SNAPSHOT_VERSION:
+            raise ValidationError('Unsupported snapshot format.')
+        SnapshotDynamicModel = dynamic_models.create_dynamic_model(header['fields'], snapshot.model_name)
+        computed_fields = header.get('computed_fields', [])
+        summary_views = header.get('summary_views', [])
+        columns = header['columns']
+        quote_name = connection.ops.quote_name
+        table = quote_name(SnapshotDynamicModel._meta.db_table)
+        column_names = ', '.join(quote_name(column) for column in columns)
+        # Progress is reported before the transaction, so the job row isn't locked until the restore is done,
+        # which would block cancellation requests and lease renewals. The restore can't be cancelled after this.
+        if on_progress is not None:
+            on_progress(10)
+
+        with transaction.atomic():
+            with dynamic_models.get_schema_editor() as schema_editor:
+                for summary_view in model_metadata.summary_views:
+                    dynamic_models.drop_summary_view(schema_editor, CurrentDynamicModel, summary_view)
+                schema_editor.delete_model(CurrentDynamicModel)
+                schema_editor.create_model(SnapshotDynamicModel)
+                dynamic_models.create_computed_schema(schema_editor, SnapshotDynamicModel, computed_fields)
+            chunks = read_chunks(snapshot_file, columns)
+            with connection.cursor() as cursor:
+                cursor.copy_expert(f'COPY {table} ({column_names}) FROM STDIN WITH (FORMAT csv)',
+                                   IteratorStream(chunks))
+                row_count = cursor.rowcount
+                dynamic_models.reset_model_sequence(cursor, SnapshotDynamicModel)
+            # Summary views are created once the rows are loaded, so they are populated right away.
+            with dynamic_models.get_schema_editor() as schema_editor:
+                dynamic_models.create_computed_schema(schema_editor, SnapshotDynamicModel,
+                                                      summary_views=summary_views)
+            model_metadata.fields = header['fields']
+            model_metadata.computed_fields = computed_fields
+            model_metadata.summary_views = summary_views
+            model_metadata.save()
+    return row_count
+
+
+def write_line(snapshot_file, data: dict):
+    snapshot_file.write(json.dumps(data, separators=(',', ':')))
+    snapshot_file.write('\n')
+
+
+def chunk_rows(rows: Iterator[tuple], chunk_size: int) -> Iterator[list]:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def read_chunks(snapshot_file, columns: list) -> Iterator[bytes]:
+    """Converts the column chunks of a snapshot file to CSV, one chunk at a time."""
+    for line in snapshot_file:
+        chunk = json.loads(line)
+        values = [chunk['columns'][column] for column in columns]
+        yield ''.join(','.join(map(to_csv_value, row)) + '\n' for row in zip(*values)).encode('utf-8')
+
+
+def to_csv_value(value) -> str:
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, int):
+        return str(value)
+    return '"' + str(value).replace('"', '""') + '"'
+
+
+class IteratorStream:
+    """Read-only file-like object over an iterator of bytes, as expected by `cursor.copy_expert()`."""
+
+    def __init__(self, chunks: Iterator[bytes]):
+        self.chunks = chunks
+        self.buffer = b''
+
+    def read(self, size: int = -1) -> bytes:
+        while size < 0 or len(self.buffer) < size:
+            chunk = next(self.chunks, None)
+            if chunk is None:
+                break
+            self.buffer += chunk
+        if size < 0:
+            size = len(self.buffer)
+        data, self.buffer = self.buffer[:size], self.buffer[size:]
+        return data
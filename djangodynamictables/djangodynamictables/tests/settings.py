@@ -0,0 +1,15 @@
+"""
+Settings for the tests: python manage.py test --settings=djangodynamictables.tests.settings
+"""
+from djangodynamictables.settings import *  # noqa: F401, F403
+from djangodynamictables.settings import DATABASES
+
+# Stand-in read replica mirroring the default database. Reads are only routed to it by the tests
+# that list it in DATABASE_REPLICAS, whatever replicas are configured in the environment.
+DATABASES['replica'] = {
+    **DATABASES['default'],
+    'TEST': {
+        'MIRROR': 'default',
+    },
+}
+DATABASE_REPLICAS = []
@@ -0,0 +1,177 @@
+import json
+from datetime import timedelta
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import F
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.authtoken.admin import User
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+from djangodynamictables import jobs, routers
+from djangodynamictables.models import DynamicModelMetadata, Job
+
+
+class TableJobAPITest(APITestCase):
+    def setUp(self) -> None:
+        self.table_name = "async_table"
+        self.valid_table_data = {
+            "name": self.table_name,
+            "fields": [
+                {"type": "string", "title": "name"},
+                {"type": "number", "title": "age"}
+            ]
+        }
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+
+    def create_table_async(self):
+        response = self.client.post(reverse('table-api') + '?async=true', self.valid_table_data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        return json.loads(response.content.decode('utf-8'))['job_id']
+
+    def get_job(self, job_id):
+        response = self.client.get(reverse('job-api-detail', kwargs={'id': job_id}), format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return json.loads(response.content.decode('utf-8'))
+
+    def test_create_table_async(self):
+        job_id = self.create_table_async()
+        self.assertEqual(self.get_job(job_id)['status'], Job.PENDING)
+        self.assertFalse(DynamicModelMetadata.objects.filter(model_name=self.table_name).exists())
+
+        jobs.run_job(jobs.claim_next_job())
+
+        res_data = self.get_job(job_id)
+        print(res_data)
+        self.assertEqual(res_data['status'], Job.SUCCEEDED)
+        self.assertEqual(res_data['progress'], 100)
+        self.assertEqual(res_data['result'], {'model_name': self.table_name})
+        self.assertTrue(DynamicModelMetadata.objects.filter(model_name=self.table_name).exists())
+
+    def test_owner_pinned_to_primary_after_job(self):
+        self.create_table_async()
+        cache.clear()
+
+        jobs.run_job(jobs.claim_next_job())
+
+        self.assertTrue(routers.is_pinned_to_primary(self.user))
+        # The pin is stored in the database, so server processes other than the job worker see it.
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT COUNT(*) FROM django_cache WHERE cache_key = %s',
+                           [cache.make_key(routers.get_pin_cache_key(self.user))])
+            self.assertEqual(cursor.fetchone()[0], 1)
+
+    def test_update_table_async(self):
+        self.client.post(reverse('table-api'), self.valid_table_data, format='json')
+        updated_table_data = {
+            "name": self.table_name,
+            "fields": [*self.valid_table_data['fields'], {"type": "boolean", "title": "is_active"}]
+        }
+        url = reverse('table-api-detail', kwargs={'id': self.table_name}) + '?async=true'
+        response = self.client.put(url, updated_table_data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+
+        jobs.run_job(jobs.claim_next_job())
+
+        self.assertEqual(self.get_job(response.data['job_id'])['status'], Job.SUCCEEDED)
+        metadata = DynamicModelMetadata.objects.get(model_name=self.table_name)
+        self.assertEqual(len(metadata.fields), 3)
+
+    def test_create_table_async_already_exists(self):
+        self.client.post(reverse('table-api'), self.valid_table_data, format='json')
+        job_id = self.create_table_async()
+
+        jobs.run_job(jobs.claim_next_job())
+
+        res_data = self.get_job(job_id)
+        self.assertEqual(res_data['status'], Job.FAILED)
+        self.assertEqual(res_data['attempts'], 1)
+        self.assertEqual(res_data['error'], 'Table already exists.')
+
+    def test_job_retried_on_error(self):
+        job_id = self.create_table_async()
+        failing_handler = mock.Mock(side_effect=RuntimeError('Connection lost.'))
+
+        with mock.patch.dict(jobs.JOB_HANDLERS, {'create_table': failing_handler}):
+            jobs.run_job(jobs.claim_next_job())
+
+        res_data = self.get_job(job_id)
+        self.assertEqual(res_data['status'], Job.PENDING)
+        self.assertEqual(res_data['error'], 'Connection lost.')
+        self.assertIsNone(jobs.claim_next_job())
+
+    def test_job_with_expired_lease_claimed_again(self):
+        job_id = self.create_table_async()
+        jobs.claim_next_job()
+        self.assertIsNone(jobs.claim_next_job())
+        lease_expired_at = timezone.now() - timedelta(seconds=settings.JOB_LEASE_SECONDS + 1)
+        Job.objects.filter(id=job_id).update(updated_at=lease_expired_at)
+
+        job = jobs.claim_next_job()
+
+        self.assertEqual(job.id, job_id)
+        self.assertEqual(job.attempts, 2)
+
+    def test_job_with_expired_lease_failed_after_max_attempts(self):
+        job_id = self.create_table_async()
+        jobs.claim_next_job()
+        lease_expired_at = timezone.now() - timedelta(seconds=settings.JOB_LEASE_SECONDS + 1)
+        Job.objects.filter(id=job_id).update(updated_at=lease_expired_at, attempts=F('max_attempts'))
+
+        self.assertIsNone(jobs.claim_next_job())
+
+        self.assertEqual(self.get_job(job_id)['status'], Job.FAILED)
+
+    def test_cancel_pending_job(self):
+        job_id = self.create_table_async()
+
+        response = self.client.delete(reverse('job-api-detail', kwargs={'id': job_id}))
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(self.get_job(job_id)['status'], Job.CANCELLED)
+        self.assertIsNone(jobs.claim_next_job())
+        response = self.client.delete(reverse('job-api-detail', kwargs={'id': job_id}))
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+
+    def test_cancel_running_job(self):
+        job_id = self.create_table_async()
+        job = jobs.claim_next_job()
+        cancellable_handler = mock.Mock(side_effect=lambda job: jobs.report_progress(job, 50))
+
+        with mock.patch.dict(jobs.JOB_HANDLERS, {'create_table': cancellable_handler}), \
+                mock.patch.object(jobs, 'CANCELLABLE_OPERATIONS', {'create_table'}):
+            response = self.client.delete(reverse('job-api-detail', kwargs={'id': job_id}))
+            self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+            jobs.run_job(job)
+
+        res_data = self.get_job(job_id)
+        self.assertEqual(res_data['status'], Job.CANCELLED)
+        self.assertTrue(res_data['cancel_requested'])
+
+    def test_cancel_running_job_not_cancellable(self):
+        job_id = self.create_table_async()
+        job = jobs.claim_next_job()
+
+        response = self.client.delete(reverse('job-api-detail', kwargs={'id': job_id}))
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        jobs.run_job(job)
+
+        res_data = self.get_job(job_id)
+        self.assertEqual(res_data['status'], Job.SUCCEEDED)
+        self.assertFalse(res_data['cancel_requested'])
+
+    def test_job_of_other_user_not_found(self):
+        job_id = self.create_table_async()
+        other_user = User.objects.create_user(username='otheruser', password='testpassword')
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + Token.objects.create(user=other_user).key)
+
+        response = self.client.get(reverse('job-api-detail', kwargs={'id': job_id}), format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,80 @@
+from django.core.cache import cache
+from django.db import connections
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.admin import User
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITransactionTestCase
+
+from djangodynamictables import dynamic_models
+from djangodynamictables.models import DynamicModelMetadata, Job
+from djangodynamictables.routers import ReplicaRouter, replica_reads_enabled
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRoutingAPITest(APITransactionTestCase):
+    # The replica alias mirrors the default database in tests, so committed rows are visible on both.
+    databases = {'default', 'replica'}
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.table_name = "replica_subscribers"
+        self.fields = [
+            {"type": "string", "title": "name"},
+            {"type": "number", "title": "age"}
+        ]
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        self.client.post(reverse('table-api'), {'name': self.table_name, 'fields': self.fields}, format='json')
+        self.client.post(reverse('table-row-api', kwargs={'id': self.table_name}), {
+            'name': 'Gym User 1',
+            'age': 30
+        }, format='json')
+
+    def tearDown(self) -> None:
+        DynamicModel = dynamic_models.create_dynamic_model(self.fields, self.table_name)
+        with dynamic_models.get_schema_editor() as schema_editor:
+            schema_editor.delete_model(DynamicModel)
+
+    def get_rows(self):
+        url = reverse('table-row-api', kwargs={'id': self.table_name})
+        with CaptureQueriesContext(connections['replica']) as replica_queries:
+            response = self.client.get(url, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 1)
+        return replica_queries
+
+    def test_reads_pinned_to_primary_after_write(self):
+        replica_queries = self.get_rows()
+
+        self.assertEqual(len(replica_queries), 0)
+
+    def test_reads_use_replica_after_pin_expires(self):
+        cache.clear()
+
+        replica_queries = self.get_rows()
+
+        self.assertEqual(len(replica_queries), 2)
+
+    def test_reads_outside_requests_use_primary(self):
+        router = ReplicaRouter()
+        self.assertIsNone(router.db_for_read(DynamicModelMetadata))
+
+        token = replica_reads_enabled.set(True)
+        try:
+            self.assertEqual(router.db_for_read(DynamicModelMetadata), 'replica')
+            self.assertIsNone(router.db_for_read(Job))
+            self.assertIsNone(router.db_for_read(User))
+        finally:
+            replica_reads_enabled.reset(token)
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_reads_use_primary_without_replicas(self):
+        cache.clear()
+
+        replica_queries = self.get_rows()
+
+        self.assertEqual(len(replica_queries), 0)
@@ -7,6 +7,8 @@ from rest_framework.authtoken.admin import User
 from rest_framework.authtoken.models import Token
 from rest_framework.test import APITestCase
 
+from djangodynamictables.models import DynamicModelMetadata
+
 
 class CreateTableAPITest(APITestCase):
     def setUp(self) -> None:
@@ -88,6 +90,60 @@ class CreateTableAPITest(APITestCase):
         self.assertEqual(res_data['fields'][0], 'Maximum of 10 fields allowed.')
 
 
+class CreateTableBatchAPITest(APITestCase):
+    def setUp(self) -> None:
+        self.fields = [
+            {"type": "string", "title": "name"},
+            {"type": "number", "title": "age"}
+        ]
+        self.valid_batch_data = {
+            "tables": [{"name": f"batch_table_{i}", "fields": self.fields} for i in range(3)]
+        }
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+
+    def test_create_tables_valid(self):
+        url = reverse('table-batch-api')
+        response = self.client.post(url, self.valid_batch_data, format='json')
+        res_data = json.loads(response.content.decode('utf-8'))
+        print(res_data)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res_data['tables'], ['batch_table_0', 'batch_table_1', 'batch_table_2'])
+        self.assertEqual(DynamicModelMetadata.objects.filter(owner=self.user).count(), 3)
+
+    def test_create_tables_invalid_table(self):
+        url = reverse('table-batch-api')
+        self.valid_batch_data['tables'][1]['fields'] = [{'type': 'invalid', 'title': 'name'}]
+        response = self.client.post(url, self.valid_batch_data, format='json')
+        res_data = json.loads(response.content.decode('utf-8'))
+        print(res_data)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res_data['tables']['1']['fields']['0']['type'][0], '"invalid" is not a valid choice.')
+        self.assertFalse(DynamicModelMetadata.objects.exists())
+
+    def test_create_tables_already_exists(self):
+        self.client.post(reverse('table-api'), self.valid_batch_data['tables'][2], format='json')
+        self.valid_batch_data['tables'].append({"name": "batch_table_0", "fields": self.fields})
+
+        response = self.client.post(reverse('table-batch-api'), self.valid_batch_data, format='json')
+        res_data = json.loads(response.content.decode('utf-8'))
+        print(res_data)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res_data['tables'], {'2': ['Table already exists.'], '3': ['Table already exists.']})
+        self.assertEqual(DynamicModelMetadata.objects.filter(owner=self.user).count(), 1)
+
+    def test_create_tables_max_allowed(self):
+        url = reverse('table-batch-api')
+        data = {"tables": [{"name": f"batch_table_{i}", "fields": self.fields} for i in range(11)]}
+        response = self.client.post(url, data, format='json')
+        res_data = json.loads(response.content.decode('utf-8'))
+        print(res_data)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res_data[0], 'Exceeded max tables allowed.')
+        self.assertFalse(DynamicModelMetadata.objects.exists())
+
+
 class UpdateTableAPITest(APITestCase):
     def setUp(self) -> None:
         self.valid_table_data = {
@@ -0,0 +1,281 @@
+import json
+import tempfile
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.admin import User
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APITestCase
+
+from djangodynamictables import expressions, jobs
+from djangodynamictables.models import DynamicModelMetadata, Job
+
+
+class CompileExpressionTest(SimpleTestCase):
+    def test_compile_expression(self):
+        sql = expressions.compile_expression('upper("first name") || \'!\' || age--1', {'first name', 'age'})
+
+        self.assertEqual(sql, 'UPPER ( "first name" ) || \'!\' || "age" - - 1')
+
+    def test_compile_expression_unknown_field(self):
+        with self.assertRaises(ValidationError):
+            expressions.compile_expression('pg_sleep(10)', {'age'})
+
+    def test_compile_expression_invalid_token(self):
+        with self.assertRaises(ValidationError):
+            expressions.compile_expression('age); DROP TABLE auth_user; --', {'age'})
+
+
+class TableComputedAPITest(APITestCase):
+    def setUp(self) -> None:
+        self.table_name = "gym_subscribers4"
+        self.valid_table_data = {
+            "name": self.table_name,
+            "fields": [
+                {"type": "string", "title": "name"},
+                {"type": "number", "title": "age"},
+                {"type": "boolean", "title": "is_active"}
+            ],
+            "computed_fields": [
+                {"type": "number", "title": "age_in_months", "expression": "age * 12"},
+                {"type": "string", "title": "label", "expression": "upper(name) || ' (' || age || ')'"}
+            ],
+            "summary_views": [
+                {
+                    "name": "by_status",
+                    "group_by": ["is_active"],
+                    "aggregates": [
+                        {"title": "subscribers", "function": "count"},
+                        {"title": "total_age", "function": "sum", "field": "age"}
+                    ]
+                },
+                {
+                    "name": "totals",
+                    "aggregates": [{"title": "subscribers", "function": "count"}],
+                    "refresh": "scheduled"
+                }
+            ]
+        }
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+
+    def create_table(self, table_data):
+        response = self.client.post(reverse('table-api'), table_data, format='json')
+        res_data = json.loads(response.content.decode('utf-8'))
+        print(res_data)
+        return response, res_data
+
+    def add_rows(self):
+        url = reverse('table-row-api', kwargs={'id': self.table_name})
+        for row in [{'name': 'ann', 'age': 30, 'is_active': True},
+                    {'name': 'bob', 'age': 41, 'is_active': False},
+                    {'name': 'cid', 'age': 52, 'is_active': True}]:
+            response = self.client.post(url, row, format='json')
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def get_summary_view(self, view_name):
+        url = reverse('table-summary-view-api', kwargs={'id': self.table_name, 'view_name': view_name})
+        response = self.client.get(url, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return json.loads(response.content.decode('utf-8'))
+
+    def test_computed_fields(self):
+        response, _ = self.create_table(self.valid_table_data)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.add_rows()
+
+        response = self.client.get(reverse('table-row-api', kwargs={'id': self.table_name}), format='json')
+        res_data = json.loads(response.content.decode('utf-8'))
+
+        self.assertEqual(res_data[0]['age_in_months'], 360)
+        self.assertEqual(res_data[0]['label'], 'ANN (30)')
+
+    def test_summary_views_refreshed_on_write(self):
+        self.create_table(self.valid_table_data)
+        self.add_rows()
+        self.assertEqual(self.get_summary_view('by_status'), [])
+        self.assertEqual(Job.objects.filter(operation='refresh_summary_views').count(), 1)
+
+        jobs.run_job(jobs.claim_next_job())
+
+        self.assertEqual(self.get_summary_view('by_status'), [
+            {'is_active': False, 'subscribers': 1, 'total_age': 41},
+            {'is_active': True, 'subscribers': 2, 'total_age': 82},
+        ])
+        self.assertEqual(self.get_summary_view('totals'), [{'subscribers': 0}])
+
+    def test_summary_views_refreshed_on_schedule(self):
+        self.create_table(self.valid_table_data)
+        self.add_rows()
+
+        call_command('refresh_summary_views')
+
+        self.assertEqual(self.get_summary_view('totals'), [{'subscribers': 3}])
+        self.assertEqual(self.get_summary_view('by_status'), [])
+
+    def test_summary_view_not_found(self):
+        self.create_table(self.valid_table_data)
+
+        url = reverse('table-summary-view-api', kwargs={'id': self.table_name, 'view_name': 'not_found'})
+        response = self.client.get(url, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_update_computed_fields_and_summary_views(self):
+        self.create_table(self.valid_table_data)
+        self.add_rows()
+        updated_table_data = {
+            **self.valid_table_data,
+            "computed_fields": [{"type": "number", "title": "age_in_months", "expression": "(age + 1) * 12"}],
+            "summary_views": [{"name": "by_name", "group_by": ["name"],
+                               "aggregates": [{"title": "max_age", "function": "max", "field": "age_in_months"}]}]
+        }
+        url = reverse('table-api-detail', kwargs={'id': self.table_name})
+        response = self.client.put(url, updated_table_data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response = self.client.get(reverse('table-row-api', kwargs={'id': self.table_name}), format='json')
+        res_data = json.loads(response.content.decode('utf-8'))
+        self.assertEqual(res_data[0], {'name': 'ann', 'age': 30, 'is_active': True, 'age_in_months': 372})
+        self.assertEqual(self.get_summary_view('by_name')[0], {'name': 'ann', 'max_age': 372})
+
+    def test_clone_table_with_computed_fields(self):
+        self.create_table(self.valid_table_data)
+        self.add_rows()
+
+        url = reverse('table-clone-api', kwargs={'id': self.table_name})
+        response = self.client.post(url, {'name': 'gym_subscribers_clone'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        response = self.client.get(reverse('table-row-api', kwargs={'id': 'gym_subscribers_clone'}), format='json')
+        self.assertEqual(response.data[2]['label'], 'CID (52)')
+        url = reverse('table-summary-view-api', kwargs={'id': 'gym_subscribers_clone', 'view_name': 'totals'})
+        self.assertEqual(self.client.get(url, format='json').data, [{'subscribers': 3}])
+
+    def test_restore_snapshot_with_computed_fields(self):
+        self.create_table(self.valid_table_data)
+        self.add_rows()
+        with tempfile.TemporaryDirectory() as snapshot_root, override_settings(SNAPSHOT_ROOT=snapshot_root):
+            response = self.client.post(reverse('table-snapshot-api', kwargs={'id': self.table_name}), format='json')
+            url = reverse('table-snapshot-restore-api',
+                          kwargs={'id': self.table_name, 'snapshot_id': response.data['id']})
+            response = self.client.post(url, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response = self.client.get(reverse('table-row-api', kwargs={'id': self.table_name}), format='json')
+        self.assertEqual(response.data[1]['label'], 'BOB (41)')
+        self.assertEqual(self.get_summary_view('totals'), [{'subscribers': 3}])
+
+    def test_computed_fields_with_long_values(self):
+        self.valid_table_data['computed_fields'][1]['expression'] = 'name || name'
+        self.create_table(self.valid_table_data)
+
+        response = self.client.post(reverse('table-row-api', kwargs={'id': self.table_name}),
+                                    {'name': 'a' * 60, 'age': 30, 'is_active': True}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        response = self.client.get(reverse('table-row-api', kwargs={'id': self.table_name}), format='json')
+        self.assertEqual(response.data[0]['label'], 'a' * 120)
+
+    def test_computed_field_overflow(self):
+        self.valid_table_data['computed_fields'][0]['expression'] = 'age * 100000000'
+        self.create_table(self.valid_table_data)
+
+        response = self.client.post(reverse('table-row-api', kwargs={'id': self.table_name}),
+                                    {'name': 'ann', 'age': 30, 'is_active': True}, format='json')
+        res_data = json.loads(response.content.decode('utf-8'))
+        print(res_data)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res_data[0], 'Invalid row for the computed fields: integer out of range')
+        response = self.client.post(reverse('table-row-api', kwargs={'id': self.table_name}),
+                                    {'name': 'bob', 'age': 20, 'is_active': True}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_computed_field_unknown_field(self):
+        self.valid_table_data['computed_fields'][0]['expression'] = 'age * months'
+
+        response, res_data = self.create_table(self.valid_table_data)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res_data['computed_fields']['0']['expression'][0], 'Unknown field months.')
+
+    def test_computed_field_invalid_type(self):
+        self.valid_table_data['computed_fields'][0]['expression'] = "name + 1"
+
+        response, res_data = self.create_table(self.valid_table_data)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertTrue(res_data['computed_fields']['0']['expression'][0].startswith('Invalid expression'))
+        self.assertFalse(DynamicModelMetadata.objects.exists())
+        response, _ = self.create_table({**self.valid_table_data, 'computed_fields': []})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_summary_view_sum_of_string_field(self):
+        self.valid_table_data['summary_views'][0]['aggregates'][1]['field'] = 'name'
+
+        response, res_data = self.create_table(self.valid_table_data)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res_data['summary_views']['0']['aggregates']['1']['field'][0], 'A number field is required.')
+
+    def test_computed_field_using_computed_field(self):
+        self.valid_table_data['computed_fields'][1]['expression'] = 'age_in_months + 1'
+
+        response, res_data = self.create_table(self.valid_table_data)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res_data['computed_fields']['1']['expression'][0], 'Unknown field age_in_months.')
+
+    def test_summary_view_max_of_boolean_field(self):
+        self.valid_table_data['summary_views'][0]['aggregates'][1] = {
+            'title': 'any_active', 'function': 'max', 'field': 'is_active'}
+
+        response, res_data = self.create_table(self.valid_table_data)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res_data['summary_views']['0']['aggregates']['1']['field'][0],
+                         'A number or string field is required.')
+
+    def test_summary_view_duplicate_group_by(self):
+        self.valid_table_data['summary_views'][0]['group_by'] = ['is_active', 'is_active']
+
+        response, res_data = self.create_table(self.valid_table_data)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res_data['summary_views']['0']['group_by'][0], 'Duplicate field is_active.')
+
+    def test_summary_view_name_too_long(self):
+        self.valid_table_data['summary_views'][1]['name'] = 'totals' * 8
+
+        response, res_data = self.create_table(self.valid_table_data)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('name', res_data['summary_views']['1'])
+
+    def test_clone_table_summary_view_name_too_long(self):
+        self.valid_table_data['summary_views'][1]['name'] = 'totals' * 4
+        self.create_table(self.valid_table_data)
+
+        url = reverse('table-clone-api', kwargs={'id': self.table_name})
+        response = self.client.post(url, {'name': 'gym_subscribers_clone'}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(DynamicModelMetadata.objects.filter(model_name='gym_subscribers_clone').exists())
+
+    def test_create_tables_computed_field_invalid_type(self):
+        self.valid_table_data['computed_fields'][1]['expression'] = "name + 1"
+        tables = [{**self.valid_table_data, 'name': 'gym_subscribers5', 'computed_fields': []}, self.valid_table_data]
+
+        response = self.client.post(reverse('table-batch-api'), {'tables': tables}, format='json')
+        res_data = json.loads(response.content.decode('utf-8'))
+        print(res_data)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertTrue(res_data['tables']['1']['computed_fields']['1']['expression'][0]
+                        .startswith('Invalid expression'))
+        self.assertFalse(DynamicModelMetadata.objects.exists())
@@ -0,0 +1,174 @@
+import json
+import os
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from django.conf import settings
+from django.db import connection
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.admin import User
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+from djangodynamictables import jobs, snapshots
+from djangodynamictables.models import DynamicModelMetadata, Job, TableSnapshot
+
+
+class TableSnapshotTestCase(APITestCase):
+    def setUp(self) -> None:
+        self.table_name = "gym_subscribers3"
+        self.valid_table_data = {
+            "name": self.table_name,
+            "fields": [
+                {"type": "string", "title": "name"},
+                {"type": "number", "title": "age"},
+                {"type": "boolean", "title": "is_active"}
+            ]
+        }
+        self.rows = [
+            {'name': 'Gym User 1', 'age': 30, 'is_active': True},
+            {'name': 'Gym "User", 2\nSecond line', 'age': 41, 'is_active': False},
+            {'name': 'Gym User 3', 'age': 52, 'is_active': True},
+        ]
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        self.client.post(reverse('table-api'), self.valid_table_data, format='json')
+        for row in self.rows:
+            self.add_row(self.table_name, row)
+
+    def add_row(self, table_name, row):
+        response = self.client.post(reverse('table-row-api', kwargs={'id': table_name}), row, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def get_rows(self, table_name):
+        response = self.client.get(reverse('table-row-api', kwargs={'id': table_name}), format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return json.loads(response.content.decode('utf-8'))
+
+
+class TableCloneAPITest(TableSnapshotTestCase):
+    def test_clone_table(self):
+        url = reverse('table-clone-api', kwargs={'id': self.table_name})
+        response = self.client.post(url, {'name': 'gym_subscribers_clone'}, format='json')
+        res_data = json.loads(response.content.decode('utf-8'))
+        print(res_data)
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.get_rows('gym_subscribers_clone'), self.rows)
+        self.add_row('gym_subscribers_clone', {'name': 'Gym User 4', 'age': 63, 'is_active': False})
+        self.assertEqual(len(self.get_rows('gym_subscribers_clone')), 4)
+        self.assertEqual(len(self.get_rows(self.table_name)), 3)
+
+    def test_clone_table_already_exists(self):
+        url = reverse('table-clone-api', kwargs={'id': self.table_name})
+        response = self.client.post(url, {'name': self.table_name}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+
+    def test_clone_table_not_found(self):
+        url = reverse('table-clone-api', kwargs={'id': 'table_not_found'})
+        response = self.client.post(url, {'name': 'gym_subscribers_clone'}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class TableSnapshotAPITest(TableSnapshotTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        snapshot_root = tempfile.TemporaryDirectory()
+        self.addCleanup(snapshot_root.cleanup)
+        settings_override = override_settings(SNAPSHOT_ROOT=snapshot_root.name, SNAPSHOT_CHUNK_SIZE=2)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def create_snapshot(self):
+        response = self.client.post(reverse('table-snapshot-api', kwargs={'id': self.table_name}), format='json')
+        res_data = json.loads(response.content.decode('utf-8'))
+        print(res_data)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return res_data
+
+    def test_create_snapshot(self):
+        res_data = self.create_snapshot()
+
+        self.assertEqual(res_data['row_count'], 3)
+        response = self.client.get(reverse('table-snapshot-api', kwargs={'id': self.table_name}), format='json')
+        self.assertEqual([snapshot['id'] for snapshot in response.data], [res_data['id']])
+
+    def test_restore_snapshot(self):
+        snapshot_id = self.create_snapshot()['id']
+        updated_table_data = {
+            "name": self.table_name,
+            "fields": self.valid_table_data['fields'][:2]
+        }
+        self.client.put(reverse('table-api-detail', kwargs={'id': self.table_name}), updated_table_data, format='json')
+        self.add_row(self.table_name, {'name': 'Gym User 4', 'age': 63})
+
+        url = reverse('table-snapshot-restore-api', kwargs={'id': self.table_name, 'snapshot_id': snapshot_id})
+        response = self.client.post(url, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.get_rows(self.table_name), self.rows)
+        metadata = DynamicModelMetadata.objects.get(model_name=self.table_name)
+        self.assertEqual(metadata.fields, self.valid_table_data['fields'])
+        self.add_row(self.table_name, self.rows[0])
+
+    def test_restore_snapshot_async(self):
+        snapshot_id = self.create_snapshot()['id']
+        self.add_row(self.table_name, self.rows[0])
+
+        url = reverse('table-snapshot-restore-api', kwargs={'id': self.table_name, 'snapshot_id': snapshot_id})
+        response = self.client.post(url + '?async=true', format='json')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        job = jobs.run_job(jobs.claim_next_job())
+
+        self.assertEqual(job.status, Job.SUCCEEDED)
+        self.assertEqual(job.result, {'model_name': self.table_name, 'row_count': 3})
+        self.assertEqual(self.get_rows(self.table_name), self.rows)
+
+    def test_restore_snapshot_reports_progress_outside_transaction(self):
+        snapshot = TableSnapshot.objects.get(id=self.create_snapshot()['id'])
+        atomic_blocks = []
+
+        snapshots.restore_snapshot(self.user, snapshot,
+                                   on_progress=lambda progress: atomic_blocks.append(len(connection.atomic_blocks)))
+
+        self.assertEqual(atomic_blocks, [len(connection.atomic_blocks)])
+
+    def test_create_snapshot_cancelled(self):
+        with self.assertRaises(jobs.JobCancelled):
+            snapshots.create_snapshot(self.user, self.table_name, on_progress=mock.Mock(side_effect=jobs.JobCancelled))
+
+        self.assertFalse(TableSnapshot.objects.exists())
+        self.assertEqual(list(Path(settings.SNAPSHOT_ROOT).glob('**/*.gz*')), [])
+
+    def test_restore_snapshot_returns_rows_copied(self):
+        snapshot = TableSnapshot.objects.get(id=self.create_snapshot()['id'])
+        snapshot.row_count = 0
+
+        self.assertEqual(snapshots.restore_snapshot(self.user, snapshot), 3)
+
+    def test_restore_snapshot_not_found(self):
+        url = reverse('table-snapshot-restore-api', kwargs={'id': self.table_name, 'snapshot_id': 1000})
+        response = self.client.post(url, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_restore_snapshot_file_not_found(self):
+        snapshot_id = self.create_snapshot()['id']
+        os.remove(TableSnapshot.objects.get(id=snapshot_id).path)
+
+        url = reverse('table-snapshot-restore-api', kwargs={'id': self.table_name, 'snapshot_id': snapshot_id})
+        response = self.client.post(url, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post(url + '?async=true', format='json')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        job = jobs.run_job(jobs.claim_next_job())
+
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.attempts, 1)
+        self.assertEqual(self.get_rows(self.table_name), self.rows)
@@ -23,6 +23,14 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/token/', views.CustomAuthToken.as_view(), name='issue_token'),
     path('api/table/', views.TableAPIView.as_view(), name='table-api'),
+    path('api/tables/batch/', views.TableBatchAPIView.as_view(), name='table-batch-api'),
     path('api/table/<str:id>/', views.TableAPIView.as_view(), name='table-api-detail'),
     path('api/table/<str:id>/rows/', views.TableRowAPIView.as_view(), name='table-row-api'),
+    path('api/table/<str:id>/clone/', views.TableCloneAPIView.as_view(), name='table-clone-api'),
+    path('api/table/<str:id>/snapshots/', views.TableSnapshotAPIView.as_view(), name='table-snapshot-api'),
+    path('api/table/<str:id>/snapshots/<int:snapshot_id>/restore/', views.TableSnapshotRestoreAPIView.as_view(),
+         name='table-snapshot-restore-api'),
+    path('api/table/<str:id>/views/<str:view_name>/', views.TableSummaryViewAPIView.as_view(),
+         name='table-summary-view-api'),
+    path('api/jobs/<int:id>/', views.JobAPIView.as_view(), name='job-api-detail'),
 ]
@@ -10,11 +10,14 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from django.apps import apps
 from django.db import models, migrations
+from django.urls import reverse
 
-from . import dynamic_models
-from .models import DynamicModelMetadata
-from .serializers import TableSerializer
-from django.db import connection, models
+from . import dynamic_models, jobs, snapshots
+from .models import DynamicModelMetadata, Job, TableSnapshot
+from .routers import ReplicaRoutingMixin
+from .serializers import JobSerializer, TableBatchSerializer, TableCloneSerializer, TableSerializer, \
+    TableSnapshotSerializer
+from django.db import DataError, connection, models, transaction
 
 APP_LABEL = 'djangodynamictables'
 
@@ -28,7 +31,7 @@ class CustomAuthToken(ObtainAuthToken):
         return Response({'token': token.key})
 
 
-class TableAPIView(APIView):
+class TableAPIView(ReplicaRoutingMixin, APIView):
     serializer_class = TableSerializer
     permission_classes = [IsAuthenticated]
 
@@ -37,22 +40,15 @@ class TableAPIView(APIView):
         serializer.is_valid(raise_exception=True)
         fields = serializer.validated_data['fields']
         model_name = serializer.validated_data['name']
-        user_tables_count = DynamicModelMetadata.objects.filter(owner=self.request.user).aggregate(count=Count('id'))[
-            'count']
-        # todo: move to settings
-        if user_tables_count > 10:
-            raise ValidationError('Exceeded max tables allowed.')
-        DynamicModel = dynamic_models.create_dynamic_model(fields, model_name)
-        if self.model_table_exists(DynamicModel):
+        computed_fields = serializer.validated_data['computed_fields']
+        summary_views = serializer.validated_data['summary_views']
+        if wants_async(request):
+            return accept_job(request, 'create_table', serializer.validated_data)
+        try:
+            dynamic_models.create_table(self.request.user, model_name, fields, computed_fields, summary_views)
+        except dynamic_models.TableAlreadyExists:
             return Response({'message': 'Table already exists.'}, status=status.HTTP_409_CONFLICT)
 
-        dynamic_models.create_model_schema(DynamicModel)
-        DynamicModelMetadata.objects.create(
-            model_name=model_name,
-            fields=fields,
-            owner=self.request.user
-        )
-
         return Response({'message': 'Dynamic model created successfully.'}, status=status.HTTP_201_CREATED)
 
     def put(self, request, id):
@@ -61,34 +57,101 @@ class TableAPIView(APIView):
         serializer.is_valid(raise_exception=True)
         fields = serializer.validated_data['fields']
         model_name = serializer.validated_data['name']
-        existing_model_metadata = self.get_model_metadata_by_name(model_name)
-        if existing_model_metadata is None:
+        computed_fields = serializer.validated_data['computed_fields']
+        summary_views = serializer.validated_data['summary_views']
+        if wants_async(request):
+            return accept_job(request, 'update_table', serializer.validated_data)
+        try:
+            dynamic_models.update_table(self.request.user, model_name, fields, computed_fields, summary_views)
+        except dynamic_models.TableDoesNotExist:
             return Response({'message': 'Table does not exist.'}, status=status.HTTP_404_NOT_FOUND)
-        print(existing_model_metadata.fields)
-        CurrentDynamicModel = dynamic_models.create_dynamic_model(existing_model_metadata.fields, model_name)
-        UpdatedDynamicModel = dynamic_models.create_dynamic_model(fields, model_name)
-
-        dynamic_models.update_model_schema(CurrentDynamicModel, UpdatedDynamicModel, serializer.validated_data,
-                                           existing_model_metadata)
-        existing_model_metadata.fields = fields
-        existing_model_metadata.save()
         return Response({'message': 'Dynamic model updated successfully.'}, status=status.HTTP_200_OK)
 
-    def get_model_metadata_by_name(self, model_name) -> DynamicModelMetadata:
-        return DynamicModelMetadata.objects.filter(model_name=model_name, owner=self.request.user).first()
 
-    def model_table_exists(self, DynamicModel):
-        return DynamicModel._meta.db_table in connection.introspection.table_names()
+class TableBatchAPIView(ReplicaRoutingMixin, APIView):
+    serializer_class = TableBatchSerializer
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        serializer = self.serializer_class(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        tables = serializer.validated_data['tables']
+        if wants_async(request):
+            return accept_job(request, 'create_tables', {'tables': tables})
+        created_tables = dynamic_models.create_tables(self.request.user, tables)
+
+        return Response({'message': 'Dynamic models created successfully.',
+                         'tables': [metadata.model_name for metadata in created_tables]},
+                        status=status.HTTP_201_CREATED)
+
+
+class TableCloneAPIView(ReplicaRoutingMixin, APIView):
+    serializer_class = TableCloneSerializer
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, id: str):
+        serializer = self.serializer_class(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        clone_model_name = serializer.validated_data['name']
+        if wants_async(request):
+            return accept_job(request, 'clone_table', {'name': id, 'clone_name': clone_model_name})
+        try:
+            dynamic_models.clone_table(self.request.user, id, clone_model_name)
+        except dynamic_models.TableDoesNotExist:
+            return Response({'message': 'Table does not exist.'}, status=status.HTTP_404_NOT_FOUND)
+        except dynamic_models.TableAlreadyExists:
+            return Response({'message': 'Table already exists.'}, status=status.HTTP_409_CONFLICT)
+
+        return Response({'message': 'Dynamic model cloned successfully.'}, status=status.HTTP_201_CREATED)
+
+
+class TableSnapshotAPIView(ReplicaRoutingMixin, APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, id: str):
+        table_snapshots = TableSnapshot.objects.filter(owner=request.user, model_name=id).order_by('-created_at')
+        return Response(TableSnapshotSerializer(table_snapshots, many=True).data, status=status.HTTP_200_OK)
+
+    def post(self, request, id: str):
+        get_object_or_404(DynamicModelMetadata, owner=request.user, model_name=id)
+        if wants_async(request):
+            return accept_job(request, 'create_snapshot', {'name': id})
+        table_snapshot = snapshots.create_snapshot(self.request.user, id)
+        return Response(TableSnapshotSerializer(table_snapshot).data, status=status.HTTP_201_CREATED)
+
+
+class TableSnapshotRestoreAPIView(ReplicaRoutingMixin, APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, id: str, snapshot_id: int):
+        table_snapshot = get_object_or_404(TableSnapshot, owner=request.user, model_name=id, id=snapshot_id)
+        get_object_or_404(DynamicModelMetadata, owner=request.user, model_name=id)
+        if wants_async(request):
+            return accept_job(request, 'restore_snapshot', {'snapshot_id': table_snapshot.id})
+        snapshots.restore_snapshot(self.request.user, table_snapshot)
+        return Response({'message': 'Snapshot restored successfully.'}, status=status.HTTP_200_OK)
+
+
+class TableSummaryViewAPIView(ReplicaRoutingMixin, APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, id: str, view_name: str):
+        try:
+            data = dynamic_models.get_summary_view_rows(request.user, id, view_name)
+        except (dynamic_models.TableDoesNotExist, dynamic_models.SummaryViewDoesNotExist) as e:
+            return Response({'message': str(e)}, status=status.HTTP_404_NOT_FOUND)
+        return Response(data, status=status.HTTP_200_OK)
 
 
-class TableRowAPIView(APIView):
+class TableRowAPIView(ReplicaRoutingMixin, APIView):
     serializer_class = TableSerializer
     permission_classes = [IsAuthenticated]
 
     def get(self, request, id: str):
         dynamic_model_metadata = get_object_or_404(DynamicModelMetadata, owner=request.user, model_name=id)
-        DynamicModel = dynamic_models.create_dynamic_model(dynamic_model_metadata.fields, id)
-        serializer = create_dynamic_serializer(dynamic_model_metadata.fields)
+        DynamicModel = dynamic_models.create_dynamic_model(dynamic_model_metadata.fields, id,
+                                                           dynamic_model_metadata.computed_fields)
+        serializer = create_dynamic_serializer(dynamic_model_metadata.fields, dynamic_model_metadata.computed_fields)
         data = serializer(DynamicModel.objects.all()[:1000], many=True).data
 
         return Response(data, status=200)
@@ -104,10 +167,47 @@ class TableRowAPIView(APIView):
         if data_count > 10:
             raise ValidationError('Exceeded max rows allowed.')
 
-        DynamicModel.objects.create(**serializer.validated_data)
+        try:
+            with transaction.atomic():
+                DynamicModel.objects.create(**serializer.validated_data)
+        except DataError as e:
+            # The row values can be valid while a computed field fails on them, e.g. a division by zero.
+            raise ValidationError(f'Invalid row for the computed fields: {str(e).splitlines()[0]}')
+        if any(summary_view['refresh'] == 'on_write' for summary_view in dynamic_model_metadata.summary_views):
+            jobs.enqueue_job(request.user, 'refresh_summary_views', {'name': id, 'refresh': 'on_write'}, unique=True)
         return Response({'message': 'Data saved successfully.'}, status=status.HTTP_201_CREATED)
 
 
+class JobAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, id: int):
+        job = get_object_or_404(Job, owner=request.user, id=id)
+        return Response(JobSerializer(job).data, status=status.HTTP_200_OK)
+
+    def delete(self, request, id: int):
+        job = get_object_or_404(Job, owner=request.user, id=id)
+        if not jobs.cancel_job(job):
+            job.refresh_from_db()
+            if job.status == Job.RUNNING:
+                return Response({'message': 'Job can not be cancelled while running.'},
+                                status=status.HTTP_409_CONFLICT)
+            return Response({'message': 'Job already finished.'}, status=status.HTTP_409_CONFLICT)
+        job.refresh_from_db()
+        return Response(JobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+
+def wants_async(request) -> bool:
+    return request.query_params.get('async', '').lower() in ('1', 'true')
+
+
+def accept_job(request, operation: str, payload: dict) -> Response:
+    job = jobs.enqueue_job(request.user, operation, payload)
+    return Response({'message': 'Job accepted.', 'job_id': job.id},
+                    status=status.HTTP_202_ACCEPTED,
+                    headers={'Location': reverse('job-api-detail', kwargs={'id': job.id})})
+
+
 def get_serializer_for_field_type(field_type: str):
     return {
         'string': serializers.CharField(min_length=3, max_length=100),
@@ -116,7 +216,8 @@ def get_serializer_for_field_type(field_type: str):
     }.get(field_type)
 
 
-def create_dynamic_serializer(fields):
+def create_dynamic_serializer(fields, computed_fields=()):
     fields_dict = {field['title']: get_serializer_for_field_type(field['type']) for field in fields}
+    fields_dict.update({field['title']: serializers.ReadOnlyField() for field in computed_fields})
     DynamicSerializer = type('DynamicSerializer', (serializers.Serializer,), fields_dict)
     return DynamicSerializer